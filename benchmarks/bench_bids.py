@@ -0,0 +1,98 @@
+# Bids stored as extra ServiceRequest rows (the old layout) versus the Bid table: listing a
+# customer's bids and accepting one when a service has thousands of outstanding bids.
+#
+#   python benchmarks/bench_bids.py --bids 5000 --customers 50
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from main import create_app, init_db, resolve_bids, db, User, Service, ServiceRequest, Bid
+
+
+def seed(bids, customers, professionals, legacy):
+    service = Service(name='bench', base_price=100.0)
+    db.session.add(service)
+    db.session.flush()
+    db.session.execute(db.insert(User), [{'username': 'customer%d' % i, 'password': 'x', 'is_customer': True} for i in range(customers)]
+                       + [{'username': 'professional%d' % i, 'password': 'x', 'is_professional': True, 'service_id': service.id}
+                          for i in range(professionals)])
+    customer_ids = [row[0] for row in db.session.execute(db.select(User.id).where(User.is_customer == True))]
+    professional_ids = [row[0] for row in db.session.execute(db.select(User.id).where(User.is_professional == True))]
+    db.session.execute(db.insert(ServiceRequest), [{'service_id': service.id, 'customer_id': c, 'request_type': 'public',
+                                                    'status': 'pending'} for c in customer_ids])
+    if legacy:
+        db.session.execute(db.insert(ServiceRequest), [
+            {'service_id': service.id, 'customer_id': customer_ids[i % customers], 'professional_id': professional_ids[i % professionals],
+             'request_type': 'public', 'status': 'pending'} for i in range(bids)])
+    else:
+        request_ids = dict(db.session.execute(db.select(ServiceRequest.customer_id, ServiceRequest.id)).all())
+        db.session.execute(db.insert(Bid), [{'request_id': request_ids[customer_ids[i % customers]],
+                                             'professional_id': professional_ids[i % professionals]} for i in range(bids)])
+    db.session.commit()
+    return customer_ids[0]
+
+
+# what bidding_requests() and accept_bid_request() used to do
+def list_legacy(customer_id):
+    return ServiceRequest.query.filter_by(status='pending', request_type='public', customer_id=customer_id).filter(
+        ServiceRequest.professional_id != None).all()
+
+
+def accept_legacy(bid_request):
+    bid_request.status = 'accepted'
+    old_bid_requests = ServiceRequest.query.filter(
+        ServiceRequest.id != bid_request.id,
+        ServiceRequest.request_type == 'public',
+        ServiceRequest.service_id == bid_request.service_id,
+        ServiceRequest.customer_id == bid_request.customer_id,
+        ServiceRequest.status == 'pending'
+    ).all()
+    for old_request in old_bid_requests:
+        db.session.delete(old_request)
+    db.session.commit()
+
+
+def list_bids(customer_id):
+    return Bid.query.join(Bid.request).filter(ServiceRequest.customer_id == customer_id, ServiceRequest.status == 'pending',
+                                              Bid.status == 'pending').all()
+
+
+def timed(fn, *args):
+    statements = []
+    listener = lambda *a: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bids', type=int, default=5000)
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--professionals', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bids.sqlite3')})
+        with app.app_context():
+            for label, legacy in [('ServiceRequest copies', True), ('Bid table', False)]:
+                db.drop_all()
+                init_db()
+                customer_id = seed(args.bids, args.customers, args.professionals, legacy)
+                listed, list_ms, list_statements = timed(list_legacy if legacy else list_bids, customer_id)
+                _, accept_ms, accept_statements = timed(accept_legacy if legacy else resolve_bids, listed[0])
+                rows = ServiceRequest.query.count()
+                db.session.remove()
+                print('%-22s list %4d bids %7.1f ms %3d statements | accept %7.1f ms %4d statements | service_requests rows %d' % (
+                    label, len(listed), list_ms, list_statements, accept_ms, accept_statements, rows))
+
+if __name__ == '__main__':
+    main()
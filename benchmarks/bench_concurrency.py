@@ -0,0 +1,111 @@
+# Read throughput while writers run close_request-style transactions (update the request and
+# the professional's rating together), with SQLite's defaults versus the app's SQLITE_PRAGMAS.
+#
+#   python benchmarks/bench_concurrency.py --readers 8 --writers 2 --seconds 5
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from main import app, db
+
+
+def seed(path, users, requests):
+    engine = create_engine('sqlite:///' + path)
+    db.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO services (id, name, base_price) VALUES (1, 'service', 100.0)")
+    conn.executemany('INSERT INTO users (id, username, password, is_professional, rating_count, avg_rating) VALUES (?, ?, ?, 1, 0, 0)',
+                     [(i, 'user%d' % i, 'x') for i in range(1, users + 1)])
+    conn.executemany("INSERT INTO service_requests (service_id, customer_id, professional_id, request_type, status, created_on) VALUES (1, ?, ?, 'private', 'accepted', '2024-01-01')",
+                     [(random.randint(1, users), random.randint(1, users)) for _ in range(requests)])
+    conn.commit()
+    conn.close()
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def run(path, pragmas, readers, writers, seconds, users, requests):
+    stop = time.perf_counter() + seconds
+    stats = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        conn = connect(path, pragmas)
+        reads = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                conn.execute('SELECT status, count(id) FROM service_requests WHERE customer_id = ? GROUP BY status',
+                             (random.randint(1, users),)).fetchall()
+                reads += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            stats['reads'] += reads
+            stats['errors'] += errors
+
+    def writer():
+        conn = connect(path, pragmas)
+        conn.isolation_level = None
+        writes = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute("UPDATE service_requests SET status = 'closed', customer_rating = 4 WHERE id = ?", (random.randint(1, requests),))
+                conn.execute('UPDATE users SET rating_count = rating_count + 1 WHERE id = ?', (random.randint(1, users),))
+                time.sleep(0.002)  # the rest of the request's work while holding the write lock
+                conn.execute('COMMIT')
+                writes += 1
+            except sqlite3.OperationalError:
+                errors += 1
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+        with lock:
+            stats['writes'] += writes
+            stats['errors'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=100000)
+    args = parser.parse_args()
+
+    configs = {
+        'sqlite defaults': {'journal_mode': 'DELETE'},
+        'app SQLITE_PRAGMAS': app.config['SQLITE_PRAGMAS'],
+    }
+    for label, pragmas in configs.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            seed(path, args.users, args.requests)
+            stats = run(path, pragmas, args.readers, args.writers, args.seconds, args.users, args.requests)
+        print('%-20s reads/s %9.1f   writes/s %7.1f   errors %d' % (
+            label, stats['reads'] / args.seconds, stats['writes'] / args.seconds, stats['errors']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Shows the query plan change (SCAN -> SEARCH) and timings for the hot ServiceRequest/Bid/User
+# filters before and after the model indexes exist, on a seeded throwaway database.
+#
+#   python benchmarks/bench_indexes.py --users 20000 --requests 500000 --bids 200000
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from main import db
+
+
+QUERIES = {
+    'professional_dashboard': "SELECT * FROM service_requests WHERE professional_id = 17 AND status = 'pending' AND request_type = 'private'",
+    'customer_summary': "SELECT status, count(id) FROM service_requests WHERE customer_id = 42 GROUP BY status",
+    'open_requests': "SELECT * FROM service_requests WHERE status = 'pending' AND request_type = 'public' AND service_id = 3 AND professional_id IS NULL",
+    'bidding_requests': "SELECT bids.* FROM bids JOIN service_requests ON service_requests.id = bids.request_id WHERE service_requests.customer_id = 42 AND service_requests.status = 'pending' AND bids.status = 'pending'",
+    'open_requests_sent_bids': "SELECT * FROM bids WHERE professional_id = 17 AND status = 'pending'",
+    'place_bid': "SELECT * FROM bids WHERE request_id = 1234 AND status = 'pending' AND professional_id = 17",
+    # the rows resolve_bids() rejects when a bid on the request is accepted
+    'resolve_bids': "SELECT id FROM bids WHERE request_id = 1234 AND status = 'pending' AND id != 1",
+    'admin_dashboard_page': "SELECT * FROM service_requests ORDER BY created_on DESC, id DESC LIMIT 51",
+    'create_request_professionals': "SELECT * FROM users WHERE is_professional = 1 AND is_verified = 1 AND service_id = 3",
+}
+
+
+def seed(path, users, requests, bids, services):
+    engine = create_engine('sqlite:///' + path)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    # start without the secondary indexes; they are added back for the second run
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'").fetchall():
+        conn.execute('DROP INDEX ' + name)
+    rng = random.Random(7)
+    conn.executemany('INSERT INTO services (id, name, base_price) VALUES (?, ?, ?)',
+                     [(i, 'service%d' % i, 100.0) for i in range(1, services + 1)])
+    conn.executemany('INSERT INTO users (id, username, password, is_customer, is_professional, is_verified, service_id) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     [(i, 'user%d' % i, 'x', i % 5 != 0, i % 5 == 0, rng.random() < 0.8, rng.randint(1, services) if i % 5 == 0 else None)
+                      for i in range(1, users + 1)])
+    statuses = ['pending', 'accepted', 'rejected', 'closed']
+    conn.executemany('INSERT INTO service_requests (service_id, customer_id, professional_id, request_type, status, created_on) VALUES (?, ?, ?, ?, ?, ?)',
+                     ((rng.randint(1, services), rng.randint(1, users), rng.choice([None, rng.randint(1, users)]),
+                       rng.choice(['public', 'private']), rng.choice(statuses), '2024-%02d-%02d 00:00:00.000000' % (rng.randint(1, 12), rng.randint(1, 28)))
+                      for _ in range(requests)))
+    conn.executemany('INSERT INTO bids (request_id, professional_id, description, status, created_on) VALUES (?, ?, ?, ?, ?)',
+                     ((rng.randint(1, requests), rng.randint(1, users // 5) * 5, 'bid', rng.choice(['pending', 'accepted', 'rejected']),
+                       '2024-%02d-%02d 00:00:00.000000' % (rng.randint(1, 12), rng.randint(1, 28)))
+                      for _ in range(bids)))
+    conn.commit()
+    return conn
+
+
+def measure(conn, label):
+    print('\n== %s' % label)
+    for name, sql in QUERIES.items():
+        plan = ' | '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql))
+        start = time.perf_counter()
+        for _ in range(5):
+            conn.execute(sql).fetchall()
+        elapsed = (time.perf_counter() - start) / 5 * 1000
+        print('%-30s %8.2f ms  %s' % (name, elapsed, plan))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--bids', type=int, default=100000)
+    parser.add_argument('--services', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        conn = seed(path, args.users, args.requests, args.bids, args.services)
+        measure(conn, 'without indexes')
+        conn.close()
+
+        engine = create_engine('sqlite:///' + path)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        engine.dispose()
+
+        conn = sqlite3.connect(path)
+        conn.execute('ANALYZE')
+        measure(conn, 'with indexes')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+# Latency (p50/p95/p99) and queries per request for the app's routes, through Flask's test
+# client against a seeded database, written to JSON so releases can be compared.
+#
+#   python benchmarks/seed.py --db /tmp/load.sqlite3 --users 1000000 --requests 10000000
+#   python benchmarks/bench_routes.py --db /tmp/load.sqlite3 --requests 200 --output results.json
+#   python benchmarks/bench_routes.py --db /tmp/load.sqlite3 --compare results.json
+#
+# Without --db a small database is seeded in a temp folder first. The routes that change
+# requests and bids write to the database, so a --db file keeps the rows they add.
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from main import create_app, db, roll_up_request, ServiceRequest, Bid
+from seed import seed
+
+
+# name -> (session role, method, url, form data); {customer_name}, {professional}, {service}
+# and {pincode} are filled in with values picked from the database
+ROUTES = [
+    ('home', None, 'GET', '/', None),
+    ('login_form', None, 'GET', '/login', None),
+    ('login', None, 'POST', '/login', {'username': '{customer_name}', 'password': 'password'}),
+    ('professional_register_form', None, 'GET', '/professional_register', None),
+    ('admin_dashboard', 'admin', 'GET', '/admin_dashboard', None),
+    ('admin_summary', 'admin', 'GET', '/admin_dashboard/summary', None),
+    ('admin_search', 'admin', 'GET', '/admin_dashboard/admin_search', None),
+    ('admin_search_username', 'admin', 'GET', '/admin_dashboard/admin_search?search_type=username&search_query=user12', None),
+    ('admin_search_pincode', 'admin', 'GET', '/admin_dashboard/admin_search?search_type=pincode&search_query={pincode}', None),
+    ('admin_search_service', 'admin', 'GET', '/admin_dashboard/admin_search?search_type=service_name&search_query=Service+1', None),
+    ('view_professional_info', 'admin', 'GET', '/admin_dashboard/view_professional_info/{professional}', None),
+    ('professional_dashboard', 'professional', 'GET', '/professional_dashboard', None),
+    ('open_requests', 'professional', 'GET', '/professional_dashboard/open_requests', None),
+    ('professional_search', 'professional', 'GET', '/professional_dashboard/professional_search', None),
+    ('professional_search_address', 'professional', 'GET', '/professional_dashboard/professional_search?search_type=address&search_query=Park', None),
+    ('professional_summary', 'professional', 'GET', '/professional_dashboard/professional_summary', None),
+    ('customer_dashboard', 'customer', 'GET', '/customer_dashboard', None),
+    ('customer_search', 'customer', 'GET', '/customer_dashboard/customer_search', None),
+    ('customer_search_pincode', 'customer', 'GET', '/customer_dashboard/customer_search?search_type=pincode&search_query={pincode}', None),
+    ('customer_search_service', 'customer', 'GET', '/customer_dashboard/customer_search?search_type=service_name&search_query=Service+2', None),
+    ('customer_search_address', 'customer', 'GET', '/customer_dashboard/customer_search?search_type=address&search_query=MG+Road', None),
+    ('create_request_form', 'customer', 'GET', '/customer_dashboard/create_request/{service}', None),
+    ('view_professional', 'customer', 'GET', '/customer_dashboard/view_professional/{professional}', None),
+    ('bidding_requests', 'customer', 'GET', '/customer_dashboard/bidding_requests', None),
+    ('customer_summary', 'customer', 'GET', '/customer_dashboard/customer_summary', None),
+    ('create_request', 'customer', 'POST', '/customer_dashboard/create_request/{service}',
+     {'professional': '{professional_name}', 'description': 'Leaking tap'}),
+    ('create_open_request', 'customer', 'GET', '/customer_dashboard/create_open_request/{service}', None),
+    ('accept_request', 'professional', 'GET', '/professional_dashboard/accept_request/{request}', None),
+    ('reject_request', 'professional', 'GET', '/professional_dashboard/reject_request/{request}', None),
+    ('close_request', 'customer', 'POST', '/customer_dashboard/close_request/{request}', {'feedback': 'Good work', 'rating': '4'}),
+    ('bid_request', 'professional', 'POST', '/professional_dashboard/bid_request/{request}', {'description': 'Can do it today'}),
+    ('accept_bid_request', 'customer', 'GET', '/customer_dashboard/accept_bid_request/{bid}', None),
+    ('reject_bid_request', 'customer', 'GET', '/customer_dashboard/reject_bid_request/{bid}', None),
+]
+
+
+# Routes that change a request or bid get a fresh one before every call, so each call does the
+# real work instead of finding it already done. Each returns the values for its url.
+def new_request(ids, status):
+    service_request = ServiceRequest(service_id=ids['service'], customer_id=ids['customer'], professional_id=ids['professional'],
+                                     request_type='private', status=status)
+    db.session.add(service_request)
+    db.session.flush()
+    roll_up_request(ids['service'], service_request.created_on, None, status)
+    db.session.commit()
+    return {'request': service_request.id}
+
+
+def new_open_request(ids, bids=0):
+    service_request = ServiceRequest(service_id=ids['service'], customer_id=ids['customer'], request_type='public', status='pending')
+    db.session.add(service_request)
+    db.session.flush()
+    roll_up_request(ids['service'], service_request.created_on, None, 'pending')
+    # the professional's bid first, then competing ones from others in the service
+    bidders = [ids['professional']] + ids['bidders']
+    rows = [Bid(request_id=service_request.id, professional_id=bidder, description='bid') for bidder in bidders[:bids]]
+    db.session.add_all(rows)
+    db.session.commit()
+    return {'request': service_request.id, 'bid': rows[0].id if rows else None}
+
+
+SETUP = {
+    'accept_request': lambda ids: new_request(ids, 'pending'),
+    'reject_request': lambda ids: new_request(ids, 'pending'),
+    'close_request': lambda ids: new_request(ids, 'accepted'),
+    'bid_request': lambda ids: new_open_request(ids),
+    'accept_bid_request': lambda ids: new_open_request(ids, bids=5),
+    'reject_bid_request': lambda ids: new_open_request(ids, bids=5),
+}
+
+
+# a busy customer and professional, so the pages show realistic amounts of data
+def pick_ids(path, rng):
+    conn = sqlite3.connect(path)
+    customer_id, customer_name = conn.execute(
+        'SELECT u.id, u.username FROM users u JOIN service_requests r ON r.customer_id = u.id '
+        'GROUP BY u.id ORDER BY count(*) DESC LIMIT 1').fetchone()
+    professional_id, professional_name, service_id = conn.execute(
+        'SELECT u.id, u.username, u.service_id FROM users u JOIN service_requests r ON r.professional_id = u.id '
+        'WHERE u.is_verified = 1 GROUP BY u.id ORDER BY count(*) DESC LIMIT 1').fetchone()
+    pincodes = [row[0] for row in conn.execute('SELECT pincode FROM users WHERE pincode IS NOT NULL LIMIT 100')]
+    bidders = [row[0] for row in conn.execute('SELECT id FROM users WHERE is_professional = 1 AND is_verified = 1 AND service_id = ? '
+                                              'AND id != ? LIMIT 10', (service_id, professional_id))]
+    conn.close()
+    return {'customer': customer_id, 'customer_name': customer_name, 'professional': professional_id,
+            'professional_name': professional_name, 'service': service_id, 'pincode': rng.choice(pincodes)[:4], 'bidders': bidders}
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run(app, ids, requests, warmup, only=None):
+    queries = [0]
+
+    def count_query(*args):
+        queries[0] += 1
+
+    sessions = {
+        'admin': {'is_admin': True, 'username': 'admin'},
+        'professional': {'is_professional': True, 'id': ids['professional'], 'username': ids['professional_name']},
+        'customer': {'is_customer': True, 'id': ids['customer'], 'username': ids['customer_name']},
+    }
+    results = {}
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count_query)
+    try:
+        for name, role, method, url, data in ROUTES:
+            if only and name not in only:
+                continue
+            form = {k: v.format(**ids) for k, v in data.items()} if data else None
+            timings, query_counts, statuses = [], [], set()
+            for i in range(warmup + requests):
+                values = ids
+                if name in SETUP:
+                    with app.app_context():
+                        values = {**ids, **SETUP[name](ids)}
+                client = app.test_client()
+                if role:
+                    with client.session_transaction() as session:
+                        session.update(sessions[role])
+                queries[0] = 0
+                start = time.perf_counter()
+                response = client.open(url.format(**values), method=method, data=form)
+                response.get_data()
+                elapsed = (time.perf_counter() - start) * 1000
+                if i >= warmup:
+                    timings.append(elapsed)
+                    query_counts.append(queries[0])
+                    statuses.add(response.status_code)
+            results[name] = {
+                'url': url.format(**values),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'mean_ms': round(sum(timings) / len(timings), 3),
+                'queries': round(sum(query_counts) / len(query_counts), 2),
+                'status': sorted(statuses),
+            }
+            print('%-30s p50 %8.2f  p95 %8.2f  p99 %8.2f ms  %5.1f queries  %s' % (
+                name, results[name]['p50_ms'], results[name]['p95_ms'], results[name]['p99_ms'], results[name]['queries'],
+                ','.join(str(s) for s in results[name]['status'])))
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_query)
+    return results
+
+
+def describe(path):
+    conn = sqlite3.connect(path)
+    counts = {table: conn.execute('SELECT count(*) FROM ' + table).fetchone()[0] for table in ('users', 'services', 'service_requests', 'bids')}
+    conn.close()
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {'revision': revision, 'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version, 'rows': counts}
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['routes']
+    print('\n%-30s %10s %10s %8s' % ('route (p95 ms)', 'baseline', 'now', 'change'))
+    for name, result in results.items():
+        if name in baseline:
+            before, after = baseline[name]['p95_ms'], result['p95_ms']
+            print('%-30s %10.2f %10.2f %+7.0f%%' % (name, before, after, (after - before) / before * 100 if before else 0))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='seeded SQLite file (see benchmarks/seed.py); a small one is generated if omitted')
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--route', action='append', help='only run this route (repeatable)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare p95 latencies with')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        config = {'ORPHAN_GC_INTERVAL': None, 'CHART_PATH': os.path.join(tmp, 'charts')}
+        if path is None:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            seed(path, users=20000, services=50, requests=200000, config=config)
+        ids = pick_ids(path, random.Random(args.seed))
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(path), **config})
+        results = run(app, ids, args.requests, args.warmup, args.route)
+        report = {'meta': describe(path), 'routes': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('\nwrote', args.output)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Cold start time of a worker: a fresh interpreter importing the app and calling create_app(),
+# optionally compared with an older revision of the tree (which did all its bootstrap work,
+# including the plotting imports, at import time).
+#
+#   python benchmarks/bench_startup.py --runs 10 --baseline <git revision>
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(directory, code, runs):
+    samples = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=directory, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    # the first run warms the OS file cache (and lets an old revision create its database)
+    return samples[1:]
+
+
+def export_revision(revision, directory):
+    files = subprocess.run(['git', 'ls-tree', '--name-only', revision], cwd=ROOT, check=True,
+                           capture_output=True, text=True).stdout.split()
+    for name in files:
+        if name.endswith('.py'):
+            source = subprocess.run(['git', 'show', '%s:%s' % (revision, name)], cwd=ROOT, check=True,
+                                    capture_output=True).stdout
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(source)
+
+
+def report(label, samples):
+    print('%-30s median %7.1f ms   min %7.1f ms   max %7.1f ms' % (label, statistics.median(samples), min(samples), max(samples)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--baseline', help='git revision to compare against')
+    args = parser.parse_args()
+
+    report('python -c pass', time_import(ROOT, 'pass', args.runs))
+    report('current create_app()', time_import(ROOT, 'import main; main.create_app()', args.runs))
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            export_revision(args.baseline, tmp)
+            report('%s import main' % args.baseline, time_import(tmp, 'import main', args.runs))
+
+
+if __name__ == '__main__':
+    main()
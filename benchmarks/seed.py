@@ -0,0 +1,148 @@
+# Fills a database with synthetic users, services, service requests and bids for load tests.
+# Rows go in with sqlite3 executemany in large chunks (not through the ORM); the secondary
+# indexes and the search index are dropped for the load and rebuilt once at the end.
+#
+#   python benchmarks/seed.py --db instance/household.sqlite3 --users 1000000 --services 100 --requests 10000000
+#
+# Every seeded user's password is "password"; the admin keeps admin/admin123.
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+from main import app, create_app, init_db, migrate_schema, reconcile_ratings, db
+
+CHUNK = 100000
+STREETS = ['MG Road', 'Park Street', 'Anna Salai', 'Linking Road', 'Brigade Road', 'Sector 17', 'Banjara Hills', 'FC Road']
+CITIES = [('Bengaluru', '560'), ('Kolkata', '700'), ('Chennai', '600'), ('Mumbai', '400'), ('Chandigarh', '160'), ('Hyderabad', '500'), ('Pune', '411')]
+STATUSES = ['pending', 'accepted', 'rejected', 'closed']
+
+
+def insert(conn, sql, rows):
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CHUNK))
+        if not chunk:
+            return count
+        conn.executemany(sql, chunk)
+        count += len(chunk)
+
+
+def user_rows(first_id, users, professional_share, services, rng):
+    password = generate_password_hash('password')
+    for i in range(first_id, first_id + users):
+        city, prefix = rng.choice(CITIES)
+        is_professional = rng.random() < professional_share
+        yield (i, 'user%d' % i, password, 'user%d@example.com' % i, '9%09d' % i,
+               '%d %s, %s' % (rng.randint(1, 400), rng.choice(STREETS), city), prefix + '%03d' % rng.randint(0, 999),
+               not is_professional, is_professional, not is_professional or rng.random() < 0.9,
+               rng.randint(1, services) if is_professional else None, rng.randint(0, 20) if is_professional else None,
+               # one of the sample documents shipped in static/pdfs
+               'professional%d.pdf' % rng.randint(1, 8) if is_professional else None)
+
+
+def request_rows(requests, customers, professionals_by_service, services, rng, open_ids):
+    now = datetime.now()
+    for i in range(1, requests + 1):
+        service_id = rng.randint(1, services)
+        created_on = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        professionals = professionals_by_service.get(service_id)
+        if not professionals or rng.random() < 0.2:
+            # open request to every professional of the service, maybe with bids
+            open_ids.append((i, service_id))
+            yield (i, service_id, rng.choice(customers), None, 'public', 'pending', created_on, None, None, None, 'Need help')
+            continue
+        status = rng.choice(STATUSES)
+        closed = status == 'closed'
+        yield (i, service_id, rng.choice(customers), rng.choice(professionals), 'private', status, created_on,
+               created_on.date() + timedelta(days=rng.randint(0, 14)) if closed else None,
+               rng.randint(1, 5) if closed else None, 'Good work' if closed else None, 'Please come over')
+
+
+def bid_rows(open_ids, bids_per_request, professionals_by_service, rng):
+    for request_id, service_id in open_ids:
+        professionals = professionals_by_service.get(service_id)
+        if not professionals:
+            continue
+        for professional_id in rng.sample(professionals, min(len(professionals), rng.randint(0, bids_per_request * 2))):
+            yield (request_id, professional_id, 'I can do this', 'pending')
+
+
+# config is passed on to create_app(), so a caller that runs the app on the seeded file in
+# the same process can set it up once with its own settings
+def seed(path, users=100000, services=100, requests=1000000, bids_per_request=3, professional_share=0.1, random_seed=42, config=None):
+    rng = random.Random(random_seed)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.abspath(path), 'ORPHAN_GC_INTERVAL': None, **(config or {})})
+    with app.app_context():
+        init_db()
+        db.engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    # load without the secondary indexes and search triggers; migrate_schema() puts them back
+    for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix\\_%' ESCAPE '\\'").fetchall():
+        conn.execute('DROP INDEX ' + name)
+    for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%\\_fts\\_%' ESCAPE '\\'").fetchall():
+        conn.execute('DROP TRIGGER ' + name)
+    first_user = conn.execute('SELECT max(id) FROM users').fetchone()[0] + 1  # after the admin
+    stats = {}
+
+    start = time.perf_counter()
+    stats['services'] = insert(conn, 'INSERT INTO services (id, name, description, base_price, estimated_duration, location) VALUES (?, ?, ?, ?, ?, ?)',
+                               ((i, 'Service %d' % i, 'Synthetic service %d' % i, float(rng.randint(2, 50) * 100), rng.randint(1, 8), rng.choice(CITIES)[0])
+                                for i in range(1, services + 1)))
+    stats['users'] = insert(conn, 'INSERT INTO users (id, username, password, email, phone_number, address, pincode, is_customer, is_professional, '
+                                  'is_verified, service_id, experience, professional_profile, is_admin, is_blocked) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)',
+                            user_rows(first_user, users, professional_share, services, rng))
+    customers = [row[0] for row in conn.execute('SELECT id FROM users WHERE is_customer = 1')]
+    professionals_by_service = {}
+    for user_id, service_id in conn.execute('SELECT id, service_id FROM users WHERE is_professional = 1 AND is_verified = 1'):
+        professionals_by_service.setdefault(service_id, []).append(user_id)
+    open_ids = []
+    stats['service_requests'] = insert(conn, 'INSERT INTO service_requests (id, service_id, customer_id, professional_id, request_type, status, '
+                                             'created_on, closed_on, customer_rating, customer_feedback, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                       request_rows(requests, customers, professionals_by_service, services, rng, open_ids))
+    stats['bids'] = insert(conn, "INSERT INTO bids (request_id, professional_id, description, status, created_on) VALUES (?, ?, ?, ?, datetime('now'))",
+                           bid_rows(open_ids, bids_per_request, professionals_by_service, rng))
+    conn.commit()
+    conn.close()
+    stats['load_seconds'] = round(time.perf_counter() - start, 1)
+
+    start = time.perf_counter()
+    with app.app_context():
+        migrate_schema()
+        reconcile_ratings()
+        db.engine.dispose()
+    stats['index_seconds'] = round(time.perf_counter() - start, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=os.path.join(app.instance_path, 'household.sqlite3'), help='SQLite file to create (default: the app\'s database)')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--services', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000000)
+    parser.add_argument('--bids-per-request', type=int, default=3, help='average bids on each open request')
+    parser.add_argument('--professional-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error('%s already exists; seed into a new file' % args.db)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    stats = seed(args.db, args.users, args.services, args.requests, args.bids_per_request, args.professional_share, args.seed)
+    for name, value in stats.items():
+        print('%-18s %s' % (name, value))
+
+if __name__ == '__main__':
+    main()
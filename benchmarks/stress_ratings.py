@@ -0,0 +1,95 @@
+# Closes thousands of requests concurrently through the close_request route and checks that
+# every professional's rating_count/rating_sum/avg_rating match their closed requests, and
+# that reconcile_ratings() finds nothing to change.
+#
+#   python benchmarks/stress_ratings.py --requests 5000 --threads 16
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app, init_db, reconcile_ratings, db, User, Service, ServiceRequest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--professionals', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'stress.sqlite3')})
+        with app.app_context():
+            init_db()
+            service = Service(name='stress', base_price=100.0)
+            customer = User(username='customer', password='x', is_customer=True, is_verified=True)
+            db.session.add_all([service, customer])
+            db.session.flush()
+            professionals = [User(username='professional%d' % i, password='x', is_professional=True, is_verified=True,
+                                  service_id=service.id) for i in range(args.professionals)]
+            db.session.add_all(professionals)
+            db.session.flush()
+            db.session.execute(db.insert(ServiceRequest), [
+                {'service_id': service.id, 'customer_id': customer.id, 'professional_id': random.choice(professionals).id,
+                 'request_type': 'private', 'status': 'accepted'} for _ in range(args.requests)])
+            db.session.commit()
+            customer_id = customer.id
+            request_ids = [row[0] for row in db.session.execute(db.select(ServiceRequest.id))]
+
+        failures = []
+
+        def worker(ids):
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess.update(is_customer=True, id=customer_id, username='customer')
+            for request_id in ids:
+                # every request is closed twice; only the first close may count
+                for _ in range(2):
+                    response = client.post('/customer_dashboard/close_request/%d' % request_id,
+                                           data={'feedback': 'ok', 'rating': str(random.randint(1, 5))})
+                    if response.status_code != 302:
+                        failures.append((request_id, response.status_code))
+
+        chunks = [request_ids[i::args.threads] for i in range(args.threads)]
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print('%d close requests in %.1f s (%.0f/s), %d failed' % (2 * len(request_ids), elapsed, 2 * len(request_ids) / elapsed, len(failures)))
+
+        with app.app_context():
+            expected = dict((row.professional_id, row) for row in db.session.execute(
+                db.select(ServiceRequest.professional_id, db.func.count(ServiceRequest.id).label('count'),
+                          db.func.sum(ServiceRequest.customer_rating).label('total'))
+                .where(ServiceRequest.status == 'closed').group_by(ServiceRequest.professional_id)))
+            mismatches = 0
+            for professional in User.query.filter_by(is_professional=True):
+                row = expected.get(professional.id)
+                count, total = (row.count, row.total) if row else (0, 0.0)
+                average = total / count if count else 0.0
+                if (professional.rating_count != count or abs(professional.rating_sum - total) > 1e-6
+                        or abs(professional.avg_rating - average) > 1e-6):
+                    mismatches += 1
+                    print('mismatch for %s: %s/%s/%s, expected %s/%s/%s' % (
+                        professional.username, professional.rating_count, professional.rating_sum,
+                        professional.avg_rating, count, total, average))
+            before = [(p.rating_count, p.rating_sum) for p in User.query.filter_by(is_professional=True).order_by(User.id)]
+            reconcile_ratings()
+            after = [(p.rating_count, p.rating_sum) for p in User.query.filter_by(is_professional=True).order_by(User.id)]
+            print('closed requests counted: %d of %d' % (sum(c for c, _ in before), len(request_ids)))
+            print('aggregate mismatches: %d, reconciliation changed: %s' % (mismatches, before != after))
+            if mismatches or before != after or failures:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
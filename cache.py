@@ -0,0 +1,139 @@
+import time
+import pickle
+import hashlib
+import functools
+import threading
+from datetime import datetime, timezone
+from collections import OrderedDict, namedtuple
+from flask import request, session, make_response
+
+
+# Small thread safe LRU whose entries expire ttl seconds after they were stored
+class TTLCache:
+    def __init__(self, ttl, max_items=1024):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._items[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# Response cache backends store entries with a per-entry TTL and keep a version number per
+# tag. Bumping a tag makes every entry stored under its old version unreachable, so an
+# invalidation is one write no matter how many entries it covers.
+# In memory, a bump only reaches the process that made it, so entries are kept at most max_ttl
+# seconds to bound how long other workers serve a page that was invalidated.
+class MemoryBackend:
+    def __init__(self, max_items=512, max_ttl=None):
+        self._entries = TTLCache(0, max_items)
+        self.max_ttl = max_ttl
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl if self.max_ttl is None else min(ttl, self.max_ttl))
+
+    def tag_version(self, tag):
+        return self._tags.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._tags[tag] = self._tags.get(tag, 0) + 1
+
+
+# Same interface on a Redis server, shared by every worker process (needs the redis package)
+class RedisBackend:
+    def __init__(self, url, prefix='household:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self._client.get(self.prefix + 'response:' + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + 'response:' + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def tag_version(self, tag):
+        return int(self._client.get(self.prefix + 'tag:' + tag) or 0)
+
+    def bump(self, tag):
+        self._client.incr(self.prefix + 'tag:' + tag)
+
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'mimetype', 'etag', 'last_modified'])
+
+
+# Caches the rendered body of GET views for ttl seconds. Entries are keyed on the endpoint,
+# the full path, the versions of the view's tags and vary() (e.g. the logged in user), and
+# are served with an ETag and Last-Modified so browsers can revalidate with a 304. Requests
+# with flashed messages pending, and responses that are not a plain 200, skip the cache.
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+
+    def cached(self, ttl, tags=(), vary=None, unless=None):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET' or '_flashes' in session or (unless and unless()):
+                    return view(*args, **kwargs)
+                key = self._key(tags, vary)
+                entry = self.backend.get(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed or session.modified:
+                        return response
+                    body = response.get_data()
+                    entry = CachedResponse(body, response.mimetype, hashlib.sha256(body).hexdigest()[:32],
+                                           datetime.now(timezone.utc).replace(microsecond=0))
+                    self.backend.set(key, entry, ttl)
+                response = make_response(entry.body)
+                response.mimetype = entry.mimetype
+                response.set_etag(entry.etag)
+                response.last_modified = entry.last_modified
+                response.headers['Cache-Control'] = 'private, no-cache'
+                if vary:
+                    response.vary.add('Cookie')
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.bump(tag)
+
+    def _key(self, tags, vary):
+        parts = [request.endpoint, request.full_path, repr(vary() if vary else None)]
+        parts.extend('%s=%d' % (tag, self.backend.tag_version(tag)) for tag in tags)
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
@@ -0,0 +1,59 @@
+import time
+import threading
+from collections import namedtuple
+
+
+class ServiceRecord:
+    __slots__ = ('id', 'name', 'description', 'base_price', 'estimated_duration', 'location')
+
+    def __init__(self, id, name, description, base_price, estimated_duration, location):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.base_price = base_price
+        self.estimated_duration = estimated_duration
+        self.location = location
+
+
+Snapshot = namedtuple('Snapshot', ['version', 'expires', 'records', 'by_id', 'by_name'])
+
+
+# Process local copy of the services table, looked up by id or name from plain dicts. The
+# whole table is reloaded when bump() is called after a write in this process, or max_age
+# seconds after the last load so writes made by other worker processes show up too. Readers
+# never lock: they use whichever immutable snapshot is current.
+class ServiceCatalog:
+    def __init__(self, loader, max_age=60):
+        self._loader = loader
+        self.max_age = max_age
+        self.version = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+
+    def all(self):
+        return self._current().records
+
+    def get(self, service_id):
+        return self._current().by_id.get(service_id)
+
+    def by_name(self, name):
+        return self._current().by_name.get(name)
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.version or snapshot.expires < time.monotonic():
+            snapshot = self._reload()
+        return snapshot
+
+    def _reload(self):
+        # a bump during the load leaves the snapshot behind self.version, so it is reloaded again
+        version = self.version
+        records = tuple(ServiceRecord(*row) for row in self._loader())
+        snapshot = Snapshot(version, time.monotonic() + self.max_age, records,
+                            {r.id: r for r in records}, {r.name: r for r in records})
+        self._snapshot = snapshot
+        return snapshot
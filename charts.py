@@ -0,0 +1,240 @@
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# matplotlib and seaborn take a long time to import, so they are only imported by the render
+# workers, the first time a chart is actually drawn
+
+
+# Every chart is addressed by the scope it belongs to (admin, or one professional/customer)
+# and a key derived from its kind and the counts it shows, so the same numbers always map
+# to the same PNG and only new numbers get rendered.
+def chart_key(scope, kind, data):
+    payload = scope + '|' + kind + '|' + repr(sorted(data.items()))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+# The counts also travel in the chart's url as query parameters, so a worker process that did
+# not render the chart (and doesn't have it on disk yet) can draw it from the url. Returns None
+# unless the parameters are numbers of a known kind that hash to key.
+def chart_from_args(scope, key, args):
+    kind = args.get('kind')
+    if kind not in CHARTS:
+        return None
+    data = {}
+    for name, value in args.items():
+        if name == 'kind':
+            continue
+        try:
+            data[name] = int(value) if value.isdigit() else float(value)
+        except ValueError:
+            return None
+    if chart_key(scope, kind, data) != key:
+        return None
+    return kind, data
+
+
+# Bounded LRU of rendered PNG bytes, mirrored on disk (one sub folder per scope) so a
+# restart does not re-render everything
+class ChartCache:
+    def __init__(self, directory, max_items=64, max_files=256):
+        self.directory = directory
+        self.max_items = max_items
+        self.max_files = max_files
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, scope, key):
+        return os.path.join(self.directory, scope, key + '.png')
+
+    def get(self, scope, key):
+        with self._lock:
+            data = self._items.get((scope, key))
+            if data is not None:
+                self._items.move_to_end((scope, key))
+                return data
+        try:
+            with open(self._path(scope, key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._remember(scope, key, data)
+        return data
+
+    def put(self, scope, key, data):
+        self._remember(scope, key, data)
+        path = self._path(scope, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a per-thread temp file first so readers never see a half written PNG
+        tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._prune_disk()
+
+    def _remember(self, scope, key, data):
+        with self._lock:
+            self._items[(scope, key)] = data
+            self._items.move_to_end((scope, key))
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def _prune_disk(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return
+        for scope_dir in os.scandir(self.directory):
+            if scope_dir.is_dir():
+                entries.extend(e for e in os.scandir(scope_dir.path) if e.name.endswith('.png'))
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def draw_user_summary(fig, data):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    if data['customers'] == 0 and data['professionals'] == 0:
+        ax.text(0.5, 0.5, "No Data Available for Users", ha='center', va='center', fontsize=12, color='gray')
+    else:
+        sns.barplot(x=['customers', 'professionals'], y=[data['customers'], data['professionals']], ax=ax)
+        ax.set_title('User Summary')
+        ax.set_xlabel('Roles')
+        ax.set_ylabel('Count')
+
+
+def draw_request_status(fig, data):
+    ax = fig.add_subplot()
+    status = ['accepted', 'rejected', 'pending', 'closed']
+    counts = [data[s] for s in status]
+    if sum(counts) == 0:
+        ax.text(0.5, 0.5, "No Data Available for Service Requests", ha='center', va='center', fontsize=12, color='gray')
+    else:
+        ax.pie(counts, labels=status, colors=['green', 'red', 'orange', 'blue'], autopct='%1.1f%%')
+        ax.set_title('Service Request Distribution Status')
+
+
+def draw_professional_requests(fig, data):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    request_types = ['Pending', 'Completed']
+    sns.barplot(x=request_types, y=[data['pending'], data['closed']], hue=request_types, palette='muted', legend=False, ax=ax)
+    ax.set_title('Summary of Request Status')
+    ax.set_xlabel('Request Type')
+    ax.set_ylabel('Count')
+
+
+def draw_professional_status(fig, data):
+    ax = fig.add_subplot()
+    status_labels = ['Accepted', 'Rejected', 'Pending', 'Closed']
+    status_counts = [data['accepted'], data['rejected'], data['pending'], data['closed']]
+    ax.pie(status_counts, labels=status_labels, colors=['green', 'red', 'orange', 'blue'], autopct='%1.1f%%')
+    ax.set_title('Distribution of Service Request Status')
+
+
+def draw_professional_rating(fig, data):
+    ax = fig.add_subplot()
+    # doughnut filled up to the average rating out of 5
+    rating = min(data['avg_rating'], 5)
+    ax.pie([rating, 5 - rating], labels=[f'{rating} out of 5', ''], colors=['#9C27B0', '#E0E0E0'], autopct='%1.1f%%',
+           startangle=90, wedgeprops=dict(width=0.3, edgecolor='black'))
+    ax.set_title('Average Rating Distribution', fontsize=16)
+    fig.tight_layout()
+
+
+def draw_customer_requests(fig, data):
+    import seaborn as sns
+    ax = fig.add_subplot()
+    request_types = ['Pending', 'Accepted', 'Rejected', 'Closed']
+    counts = [data['pending'], data['accepted'], data['rejected'], data['closed']]
+    sns.barplot(x=request_types, y=counts, hue=request_types, palette='muted', legend=False, ax=ax)
+    ax.set_title('Customer Service Request Distribution')
+    ax.set_xlabel('Request Status')
+    ax.set_ylabel('Count')
+
+
+CHARTS = {
+    'user_summary': draw_user_summary,
+    'request_status': draw_request_status,
+    'professional_requests': draw_professional_requests,
+    'professional_status': draw_professional_status,
+    'professional_rating': draw_professional_rating,
+    'customer_requests': draw_customer_requests,
+}
+
+
+# Renders charts on a pool of background threads with matplotlib's object oriented API.
+# Each worker owns one Figure (kept in thread local storage and cleared between charts),
+# so workers never share pyplot's global figure state and renders scale with the pool size.
+# Pages only ask for a key; the PNG is produced off the request path and the image request
+# waits for it if it is not ready yet. on_render(kind, seconds) is told how long each chart took.
+class ChartRenderer:
+    def __init__(self, cache, workers=4, on_render=None):
+        self.cache = cache
+        self.on_render = on_render
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart-render')
+
+    def submit(self, scope, kind, data):
+        key = chart_key(scope, kind, data)
+        with self._lock:
+            if (scope, key) in self._pending:
+                return key
+        if self.cache.get(scope, key) is not None:
+            return key
+        with self._lock:
+            if (scope, key) not in self._pending:
+                self._pending[(scope, key)] = self._executor.submit(self._render, scope, key, kind, data)
+        return key
+
+    def get(self, scope, key, timeout=10):
+        data = self.cache.get(scope, key)
+        if data is not None:
+            return data
+        with self._lock:
+            future = self._pending.get((scope, key))
+        if future is None:
+            # the render may have finished between the two lookups
+            return self.cache.get(scope, key)
+        return future.result(timeout=timeout)
+
+    def _figure(self):
+        from matplotlib import rcParams
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = getattr(self._local, 'figure', None)
+        if fig is None:
+            fig = Figure(figsize=(8, 6))
+            FigureCanvasAgg(fig)
+            self._local.figure = fig
+        fig.clear()
+        # undo any tight_layout() left behind by the previous chart on this figure
+        fig.subplots_adjust(**{k: rcParams['figure.subplot.' + k] for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+        return fig
+
+    def _render(self, scope, key, kind, data):
+        try:
+            start = time.perf_counter()
+            fig = self._figure()
+            CHARTS[kind](fig, data)
+            buf = BytesIO()
+            fig.savefig(buf, format='png')
+            png = buf.getvalue()
+            if self.on_render:
+                self.on_render(kind, time.perf_counter() - start)
+            self.cache.put(scope, key, png)
+            return png
+        finally:
+            with self._lock:
+                self._pending.pop((scope, key), None)
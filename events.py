@@ -0,0 +1,107 @@
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['name', 'payload', 'created'])
+
+
+# Local broker: a bounded FIFO shared by the publishing request threads and the bus worker.
+# Anything with the same put/get_batch interface (e.g. a Redis list) can take its place.
+class InMemoryBroker:
+    def __init__(self, max_size=1000):
+        self._queue = queue.Queue(max_size)
+
+    # raises queue.Full if the queue is still full after timeout seconds
+    def put(self, event, timeout=None):
+        self._queue.put(event, timeout=timeout)
+
+    # waits up to timeout for the first event, then takes whatever else is already queued
+    def get_batch(self, max_items, timeout=None):
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+# In-process publish/subscribe for request lifecycle events. Routes publish after their commit
+# and return straight away; one background worker hands the events to the consumers in
+# batches. When the queue is full, publish() waits at most publish_timeout and then drops the
+# event (counted in dropped), so a slow consumer never holds up a request for long.
+class EventBus:
+    def __init__(self, broker=None, batch_size=100, flush_interval=0.5, publish_timeout=0.05):
+        self.broker = broker or InMemoryBroker()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.publish_timeout = publish_timeout
+        self.dropped = 0
+        self._consumers = []
+        self._stopping = threading.Event()
+        self._worker = None
+
+    # consumer(events) is called with a list of events; names limits which events it gets
+    def subscribe(self, consumer, names=None):
+        self._consumers.append((consumer, frozenset(names) if names else None))
+        return consumer
+
+    def publish(self, name, **payload):
+        try:
+            self.broker.put(Event(name, payload, time.time()), timeout=self.publish_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('event queue full, dropped %s', name)
+            return False
+
+    def start(self):
+        if self._worker is None:
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name='event-bus', daemon=True)
+            self._worker.start()
+
+    # stops the worker once the queued events have been delivered
+    def stop(self, timeout=5):
+        if self._worker is not None:
+            self._stopping.set()
+            self._worker.join(timeout)
+            self._worker = None
+
+    # delivers everything queued so far on the calling thread (for tests and scripts)
+    def drain(self):
+        delivered = 0
+        while True:
+            batch = self.broker.get_batch(self.batch_size, timeout=0)
+            if not batch:
+                return delivered
+            self._dispatch(batch)
+            delivered += len(batch)
+
+    def _run(self):
+        while True:
+            batch = self.broker.get_batch(self.batch_size, timeout=self.flush_interval)
+            if batch:
+                self._dispatch(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _dispatch(self, batch):
+        for consumer, names in self._consumers:
+            events = batch if names is None else [e for e in batch if e.name in names]
+            if not events:
+                continue
+            try:
+                consumer(events)
+            except Exception:
+                logger.exception('event consumer %s failed', getattr(consumer, '__name__', consumer))
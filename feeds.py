@@ -0,0 +1,129 @@
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# One connected client: a bounded queue of messages from the channels it listens to
+class Subscription:
+    def __init__(self, channels, max_queue):
+        self.channels = channels
+        self.queue = queue.Queue(max_queue)
+
+
+# In-memory fan-out for live feeds. The event bus publishes each message once per channel and
+# the hub copies it into the queue of every subscriber of that channel; nothing is read from
+# the database per client. A client that stops reading and fills its queue gets its backlog
+# replaced by a single 'resync' message telling it to reload, so it can't hold memory forever.
+class FeedHub:
+    def __init__(self, max_queue=100, max_subscribers=1000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._channels = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    # returns None once max_subscribers clients are connected
+    def subscribe(self, *channels):
+        subscription = Subscription(channels, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            self._count += 1
+            for channel in channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._count -= 1
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, event, data):
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                _resync(subscription)
+        return len(subscribers)
+
+    def subscriber_count(self):
+        return self._count
+
+    # yields a subscription's messages as an SSE body, with a comment line every heartbeat
+    # seconds so proxies keep the connection open; unsubscribes when the client goes away
+    def stream(self, subscription, heartbeat=15):
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    yield subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+
+# FeedHub shared by every worker process through Redis pub/sub. publish() sends the message to
+# Redis, and a listener thread in each process hands whatever arrives to that process's own
+# subscribers, so a client connected to any worker gets the messages published by all of them.
+class RedisFeedHub(FeedHub):
+    def __init__(self, url, max_queue=100, max_subscribers=1000, prefix='household:feed:'):
+        import redis
+        super().__init__(max_queue, max_subscribers)
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._listener = None
+
+    def publish(self, channel, event, data):
+        return self._client.publish(self.prefix + channel, json.dumps([event, data]))
+
+    def start(self):
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name='feed-relay', daemon=True)
+            self._listener.start()
+
+    # reconnects after a lost connection; messages published meanwhile are missed, so the
+    # clients are told to reload
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    event, data = json.loads(message['data'])
+                    FeedHub.publish(self, message['channel'].decode()[len(self.prefix):], event, data)
+            except Exception:
+                logger.exception('feed relay lost its Redis connection')
+                with self._lock:
+                    subscribers = {s for channel in self._channels.values() for s in channel}
+                for subscription in subscribers:
+                    _resync(subscription)
+                time.sleep(1)
+
+
+def _resync(subscription):
+    while True:
+        try:
+            subscription.queue.get_nowait()
+        except queue.Empty:
+            break
+    try:
+        subscription.queue.put_nowait(format_sse('resync', {}))
+    except queue.Full:
+        pass
+
+
+def format_sse(event, data):
+    return 'event: %s\ndata: %s\n\n' % (event, json.dumps(data))
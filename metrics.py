@@ -0,0 +1,161 @@
+import time
+import bisect
+import logging
+import threading
+from flask import g, request, has_request_context, before_render_template, template_rendered
+
+slow_query_log = logging.getLogger('sql.slow')
+
+# upper bounds of the histogram buckets: seconds for timings, plain numbers for query counts
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Fixed-bucket histograms and counters keyed by name and labels, rendered in the Prometheus
+# text format. Observing is a dict lookup and a bisect under one lock, cheap enough to run on
+# every request and query.
+class Metrics:
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # gauges are read when the metrics are rendered
+    def gauge(self, name, read):
+        self._gauges[name] = read
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = sorted((k, (h.buckets, list(h.counts), h.sum, h.count)) for k, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append('# HELP %s %s' % (name, self._help[name]))
+                lines.append('# TYPE %s %s' % (name, kind))
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, n in zip(buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append('%s_bucket%s %d' % (name, _labels(labels + (('le', bound),)), cumulative))
+            lines.append('%s_sum%s %r' % (name, _labels(labels), total))
+            lines.append('%s_count%s %d' % (name, _labels(labels), count))
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append('%s%s %r' % (name, _labels(labels), value))
+        for name, read in sorted(self._gauges.items()):
+            header(name, 'gauge')
+            lines.append('%s %r' % (name, read()))
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+
+
+# Times every query on engine. Inside a request the query count and database time are added
+# to the request's totals; queries slower than slow_query_ms are logged with their parameters.
+def instrument_engine(metrics, engine, slow_query_ms=200):
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        metrics.observe('db_query_seconds', elapsed)
+        if has_request_context() and 'metrics_queries' in g:
+            g.metrics_queries += 1
+            g.metrics_db_seconds += elapsed
+        if elapsed * 1000 >= slow_query_ms:
+            metrics.inc('db_slow_queries_total')
+            slow_query_log.warning('%.1f ms: %s %r', elapsed * 1000, statement, parameters)
+
+    # after_cursor_execute doesn't run for a statement that raised; drop its start time so the
+    # list kept on the pooled connection doesn't grow
+    def handle_error(context):
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
+
+
+# Per request: duration by route, method and status, plus query count and database time by
+# route; template render time by template
+def instrument_app(metrics, app):
+    metrics.describe('http_request_seconds', 'Request duration by route.')
+    metrics.describe('http_request_queries', 'SQL queries per request by route.')
+    metrics.describe('http_request_db_seconds', 'Time spent in SQL per request by route.')
+    metrics.describe('template_render_seconds', 'Template render time by template.')
+    metrics.describe('db_query_seconds', 'Duration of every SQL query.')
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' in g:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.observe('http_request_seconds', time.perf_counter() - g.metrics_start, route=route,
+                            method=request.method, status=response.status_code)
+            metrics.observe('http_request_queries', g.metrics_queries, buckets=COUNT_BUCKETS, route=route)
+            metrics.observe('http_request_db_seconds', g.metrics_db_seconds, route=route)
+        return response
+
+    def template_started(sender, template, context, **extra):
+        g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        starts = g.get('metrics_templates')
+        if starts:
+            metrics.observe('template_render_seconds', time.perf_counter() - starts.pop(), template=template.name)
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
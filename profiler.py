@@ -0,0 +1,95 @@
+import os
+import re
+import sys
+import time
+import itertools
+import threading
+from collections import Counter
+
+OTHER = '[other]'
+
+
+def collapse(frame, max_depth=64):
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append('%s:%s' % (os.path.basename(code.co_filename), code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+# Statistical profiler for selected requests. While a request is being profiled, one shared
+# background thread samples that request thread's stack every interval seconds; the samples
+# are aggregated per route as collapsed stacks ("a;b;c count", the input of flamegraph.pl and
+# speedscope) and written to <directory>/<route>.folded. Each route keeps at most max_stacks
+# distinct stacks (the rest are counted under [other]), so memory stays bounded. With no
+# request selected the sampler thread sleeps and unselected requests pay one counter step.
+class Profiler:
+    def __init__(self, directory, every=None, interval=0.005, max_stacks=2000, flush_interval=30):
+        self.directory = directory
+        self.every = every
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.flush_interval = flush_interval
+        self._counter = itertools.count(1)
+        self._active = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_write = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    # 1 in every `every` requests, or any request forced by the caller
+    def should_profile(self, forced=False):
+        return forced or (bool(self.every) and next(self._counter) % self.every == 0)
+
+    def start(self):
+        thread_id = threading.get_ident()
+        samples = Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+        self._wake.set()
+        return thread_id
+
+    def finish(self, thread_id, route):
+        with self._lock:
+            samples = self._active.pop(thread_id, None)
+            if not samples:
+                return
+            stacks = self._routes.setdefault(route, Counter())
+            for stack, count in samples.items():
+                if stack in stacks or len(stacks) < self.max_stacks:
+                    stacks[stack] += count
+                else:
+                    stacks[OTHER] += count
+        if time.monotonic() - self._last_write >= self.flush_interval:
+            self.write()
+
+    def write(self):
+        self._last_write = time.monotonic()
+        with self._lock:
+            routes = {route: dict(stacks) for route, stacks in self._routes.items()}
+        os.makedirs(self.directory, exist_ok=True)
+        for route, stacks in routes.items():
+            path = os.path.join(self.directory, (re.sub(r'[^\w.-]+', '_', route).strip('_') or 'root') + '.folded')
+            tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+            with open(tmp_path, 'w') as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write('%s %d\n' % (stack, count))
+            os.replace(tmp_path, path)
+        return len(routes)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse(frame)] += 1
+                if not self._active:
+                    self._wake.clear()
+            del frames
+            time.sleep(self.interval)
@@ -0,0 +1,158 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+from collections import namedtuple
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF-'
+
+
+class UploadRejected(ValueError):
+    pass
+
+
+# Copies an uploaded file into directory chunk by chunk, hashing it on the way, and stores it
+# under its sha256 (e.g. '<hash>.pdf'). The first chunk must start with magic and the upload
+# is abandoned as soon as it grows past max_size. The data goes to a temp file in the same
+# directory and is renamed into place, so a half written file is never visible; a file whose
+# content is already stored is dropped and the existing copy is referenced instead.
+def store_upload(stream, directory, max_size, magic=PDF_MAGIC, extension='.pdf', chunk_size=CHUNK_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(magic):
+                    raise UploadRejected('file is not a %s document' % extension.lstrip('.').upper())
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadRejected('file is larger than %d bytes' % max_size)
+                digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise UploadRejected('file is empty')
+        name = digest.hexdigest() + extension
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # referenced again: make it young so the orphan collector leaves it alone
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Gives a file stored under its original name a content addressed name as well (a hard link
+# where the filesystem allows it, otherwise a copy) and returns that name. The original is
+# left in place for the unreferenced file cleanup to remove. The new name is made young so the
+# cleanup leaves it alone until the user row pointing at it is committed.
+def adopt_file(directory, name):
+    path = os.path.join(directory, name)
+    extension = os.path.splitext(name)[1]
+    hashed = file_digest(path) + extension
+    target = os.path.join(directory, hashed)
+    if not os.path.exists(target):
+        try:
+            os.link(path, target)
+        except OSError:
+            tmp_path = target + '.tmp'
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+    # a hard link keeps the original's (old) mtime
+    os.utime(target)
+    return hashed
+
+
+def is_content_addressed(name):
+    stem = os.path.splitext(name)[0]
+    return len(stem) == 64 and all(c in '0123456789abcdef' for c in stem)
+
+
+# Takes an exclusive lock on the file at path without waiting, and returns the open file that
+# holds it (the lock lasts until it is closed or the process exits), or None if another
+# process has it.
+def try_lock_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+CollectResult = namedtuple('CollectResult', ['scanned', 'removed', 'reclaimed_bytes'])
+
+
+# Removes the files in directories whose names are not in referenced, in one pass over each
+# directory. Files younger than min_age seconds are kept (an upload may not be committed yet).
+# Candidates are removed batch_size at a time, and still_referenced(names), if given, can
+# veto names that became referenced since the referenced set was read.
+def collect_orphans(directories, referenced, min_age=3600, batch_size=100, still_referenced=None, dry_run=False):
+    scanned = removed = reclaimed = 0
+    cutoff = time.time() - min_age
+    batch = []
+
+    def flush():
+        nonlocal removed, reclaimed
+        keep = still_referenced({name for name, path, size in batch}) if still_referenced else set()
+        for name, path, size in batch:
+            if name in keep:
+                continue
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+            reclaimed += size
+        batch.clear()
+
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                scanned += 1
+                if entry.name in referenced:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                batch.append((entry.name, entry.path, stat.st_size))
+                if len(batch) >= batch_size:
+                    flush()
+    if batch:
+        flush()
+    return CollectResult(scanned, removed, reclaimed)
@@ -0,0 +1,7 @@
+# Server entry point, e.g.
+#   flask --app wsgi init-db
+#   flask --app wsgi run
+#   gunicorn -w 4 wsgi:app   (set FEED_REDIS_URL so the live feed reaches every worker)
+from main import create_app
+
+app = create_app()